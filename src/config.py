@@ -1,19 +1,26 @@
 """Configuration handling for Veo MCP server"""
 
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional, TypeAlias
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
 
+# Supported Veo model names
+VeoModel: TypeAlias = Literal["veo-2.0-generate-001", "veo-3.0-generate-preview", "veo-3.0-fast-generate-preview"]
+
+# Whether the .env file has already been loaded into the environment
+_DOTENV_LOADED = False
+
 
 class Config(BaseModel):
     """Server configuration"""
 
     config_dir: str = Field(description="Configuration directory path")
     gemini_api_key: str = Field(description="Gemini API key for Veo access")
-    veo_model: Literal["veo-2.0-generate-001", "veo-3.0-generate-preview", "veo-3.0-fast-generate-preview"] = Field(
+    veo_model: VeoModel = Field(
         description="Default Veo model to use"
     )
 
@@ -27,15 +34,32 @@ class Config(BaseModel):
     @classmethod
     def from_env(cls) -> "Config":
         """Load configuration from environment variables"""
-        # Load .env file if it exists
-        load_dotenv()
+        global _DOTENV_LOADED
+
+        # Load .env file if it exists (only once per process). Checking the
+        # expected location directly avoids load_dotenv()'s directory walk
+        if not _DOTENV_LOADED:
+            dotenv_path = Path(os.environ.get("DOTENV_PATH") or Path.cwd() / ".env")
+            if dotenv_path.is_file():
+                load_dotenv(dotenv_path)
+            _DOTENV_LOADED = True
 
         # Get configuration directory with default
         config_dir = os.environ.get("CONFIG_DIR", str(Path.home() / ".pmind-veo-mcp"))
 
-        # Create config with Pydantic validation
-        return cls(
-            config_dir=config_dir,
-            gemini_api_key=os.environ.get("GEMINI_API_KEY"),
-            veo_model=os.environ.get("VEO_MODEL"),
+        # Reuse the validated config as long as the watched variables are unchanged
+        return _cached_config(
+            config_dir,
+            os.environ.get("GEMINI_API_KEY"),
+            os.environ.get("VEO_MODEL"),
         )
+
+
+@lru_cache(maxsize=8)
+def _cached_config(config_dir: str, gemini_api_key: Optional[str], veo_model: Optional[str]) -> Config:
+    """Create config with Pydantic validation, memoized by its environment values"""
+    return Config(
+        config_dir=config_dir,
+        gemini_api_key=gemini_api_key,
+        veo_model=veo_model,
+    )
@@ -2,20 +2,27 @@
 
 import asyncio
 import logging
-
-from fastmcp import FastMCP
+from typing import TYPE_CHECKING
 
 from .config import Config
-from .services import video_generation
 from .utils.logging import setup_logging
 
-# Configure logging
-setup_logging(level="INFO", format="[%(levelname)s] %(message)s")
+if TYPE_CHECKING:
+    from fastmcp import FastMCP
+
+# Logging is configured in main(); until then records from this module are dropped
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 
-def create_server() -> FastMCP:
+def create_server() -> "FastMCP":
     """Create and configure the MCP server"""
+    # Imported here so that importing this module stays cheap; fastmcp pulls in
+    # a large dependency tree (auth, crypto, http clients) at import time
+    from fastmcp import FastMCP
+
+    from .services import video_generation
+
     # Load configuration
     logger.debug("Loading configuration from environment...")
     try:
@@ -62,12 +69,22 @@ Note: Videos are stored on Google's servers for 2 days. Download within this per
     return mcp
 
 
-# Create the server instance
-mcp = create_server()
+def __getattr__(name: str):
+    """Create the server instance on first access to ``mcp`` (PEP 562)"""
+    if name == "mcp":
+        global mcp
+        mcp = create_server()
+        return mcp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
     """Main entry point for the server"""
+    # Configure logging
+    setup_logging(level="INFO", format="[%(levelname)s] %(message)s")
+
+    global mcp
+    mcp = create_server()
 
     # Run the server
     logger.info("Starting PMIND Veo3 JSON MCP server...")
@@ -2,26 +2,103 @@
 
 import asyncio
 import logging
+import threading
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Annotated, Any, Dict, Literal, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    TypeAlias,
+)
 
-from fastmcp import FastMCP
 from pydantic import Field
 
-from ..config import Config
-from ..utils.common import parse_bool_param, parse_int_param
+from ..config import Config, VeoModel
+from ..utils.common import BoolParam, IntParam, OptionalIntParam
 from ..utils.generation_manager import GenerationManager
-from ..utils.veo_client import VeoClient
+from ..utils.veo_client import VeoClient, extract_file_id
+
+if TYPE_CHECKING:
+    from fastmcp import FastMCP
 
 logger = logging.getLogger(__name__)
 
+# Video parameter types shared by the tool signatures
+AspectRatio: TypeAlias = Literal["16:9", "9:16"]
+PersonGeneration: TypeAlias = Literal["dont_allow", "allow_adult"]
+Resolution: TypeAlias = Literal["720p", "1080p"]
+
+# Maximum length of prompt and error text in session listings
+_TRUNCATE = 100
+
+
+@lru_cache(maxsize=4)
+def _get_veo_client(api_key: str, model: Optional[str]) -> VeoClient:
+    """Return a shared VeoClient for the given API key and model"""
+    return VeoClient(api_key, model)
+
+
+def _truncate(text: str) -> str:
+    """Shorten text to _TRUNCATE characters for session listings"""
+    return text if len(text) <= _TRUNCATE else text[:_TRUNCATE] + "..."
+
+
+def _format_session(gen: Dict[str, Any]) -> Dict[str, Any]:
+    """Format a generation session state for display"""
+    status = gen["status"]
+    session_info = {
+        "session_id": gen["session_id"],
+        "status": status,
+        "progress": gen.get("progress", ""),
+        "prompt": _truncate(gen.get("prompt") or ""),
+        "model": gen["model"],
+        "started_at": gen["started_at"],
+        "pid": gen.get("pid"),
+    }
+
+    # Add video count if completed
+    if status == "completed":
+        session_info["video_count"] = gen["video_count"]
+
+    # Add error if failed
+    error = gen.get("error")
+    if error:
+        session_info["error"] = _truncate(error)
+
+    return session_info
 
-def register_tools(mcp: FastMCP, config: Config):
+
+def register_tools(mcp: "FastMCP", config: Config):
     """Register video generation tools with subprocess-based approach"""
 
-    # Initialize generation manager with state directory
-    generation_manager = GenerationManager(state_dir=str(Path(config.config_dir) / "generation_states"))
+    # The generation manager is created on the first tool call rather than during
+    # registration, so the server can answer the MCP handshake without touching
+    # the state directory
+    generation_manager_lock = threading.Lock()
+    generation_manager_instance: Optional[GenerationManager] = None
+
+    def get_generation_manager() -> GenerationManager:
+        """Return the shared generation manager, creating it on first use"""
+        nonlocal generation_manager_instance
+        if generation_manager_instance is None:
+            with generation_manager_lock:
+                if generation_manager_instance is None:
+                    generation_manager_instance = GenerationManager(
+                        state_dir=str(Path(config.config_dir) / "generation_states"), config=config
+                    )
+        return generation_manager_instance
+
+    async def list_formatted_sessions(active_only: bool) -> List[Dict[str, Any]]:
+        """List generation sessions formatted for display"""
+        generation_manager = await asyncio.to_thread(get_generation_manager)
+        result = await asyncio.to_thread(generation_manager.list_generations, active_only=active_only)
+        return [_format_session(gen) for gen in result]
 
     @mcp.tool
     async def veo_generate_video(
@@ -41,7 +118,7 @@ def register_tools(mcp: FastMCP, config: Config):
         ] = None,
         # Model selection
         model: Annotated[
-            Optional[Literal["veo-2.0-generate-001", "veo-3.0-generate-preview", "veo-3.0-fast-generate-preview"]],
+            Optional[VeoModel],
             Field(
                 default="veo-3.0-fast-generate-preview",
                 description="Veo model to use for generation. veo-3.0-fast optimizes for speed.",
@@ -49,7 +126,7 @@ def register_tools(mcp: FastMCP, config: Config):
         ] = "veo-3.0-fast-generate-preview",
         # Video parameters
         aspect_ratio: Annotated[
-            Literal["16:9", "9:16"],
+            AspectRatio,
             Field(
                 default="16:9",
                 description="Video aspect ratio (SDK supports 16:9 and 9:16)",
@@ -63,44 +140,44 @@ def register_tools(mcp: FastMCP, config: Config):
             ),
         ] = None,
         person_generation: Annotated[
-            Literal["dont_allow", "allow_adult"],
+            PersonGeneration,
             Field(
                 default="allow_adult",
                 description="Control person generation in videos (SDK supports dont_allow, allow_adult)",
             ),
         ] = "allow_adult",
         resolution: Annotated[
-            Optional[Literal["720p", "1080p"]],
+            Optional[Resolution],
             Field(default=None, description="Video resolution (if supported by model)"),
         ] = None,
         number_of_videos: Annotated[
-            Union[int, str],
+            IntParam,
             Field(
                 default=1,
                 description="Number of video variations to generate (1-4)",
             ),
         ] = 1,
         duration_seconds: Annotated[
-            Optional[Union[int, str]],
+            OptionalIntParam,
             Field(
                 default=None,
                 description="Video duration in seconds (2-15). Not supported by veo-3.0-fast model. SDK uses model default if not specified.",
             ),
         ] = None,
         seed: Annotated[
-            Optional[Union[int, str]],
+            OptionalIntParam,
             Field(default=None, description="Seed for reproducible generation"),
         ] = None,
         # Advanced options
         enhance_prompt: Annotated[
-            Union[bool, str],
+            BoolParam,
             Field(
                 default=False,
                 description="Let the model enhance your prompt for better results",
             ),
         ] = False,
         generate_audio: Annotated[
-            Union[bool, str],
+            BoolParam,
             Field(
                 default=False,
                 description="Generate audio for the video",
@@ -114,7 +191,7 @@ def register_tools(mcp: FastMCP, config: Config):
             ),
         ] = None,
         fps: Annotated[
-            Optional[Union[int, str]],
+            OptionalIntParam,
             Field(
                 default=None,
                 description="Frames per second for video generation",
@@ -145,13 +222,7 @@ def register_tools(mcp: FastMCP, config: Config):
             Image-to-video: Use image_path="/path/to/image.jpg" with optional prompt
         """
         try:
-            # Parse parameters that might come as strings
-            number_of_videos = parse_int_param(number_of_videos, default=1)
-            duration_seconds = parse_int_param(duration_seconds)
-            seed = parse_int_param(seed)
-            fps = parse_int_param(fps)
-            enhance_prompt = parse_bool_param(enhance_prompt) if enhance_prompt is not None else False
-            generate_audio = parse_bool_param(generate_audio) if generate_audio is not None else False
+            generation_manager = await asyncio.to_thread(get_generation_manager)
 
             # Validate inputs
             if not prompt and not image_path:
@@ -187,8 +258,10 @@ def register_tools(mcp: FastMCP, config: Config):
                         "success": False,
                     }
 
-            # Start generation process (no automatic download)
-            result = generation_manager.start_generation(
+            # Start generation process (no automatic download); it writes state
+            # durably and may start pool workers, so it runs off the event loop
+            result = await asyncio.to_thread(
+                generation_manager.start_generation,
                 prompt=prompt,
                 model=model,
                 image_path=image_path,
@@ -206,12 +279,15 @@ def register_tools(mcp: FastMCP, config: Config):
                 download_path=None,  # No automatic download
             )
 
-            # Get initial status
-            status = generation_manager.get_status(result["session_id"])
+            if result["status"] == "failed":
+                return {
+                    "error": f"Failed to start video generation: {result['error']}",
+                    "success": False,
+                }
 
             return {
                 "session_id": result["session_id"],
-                "status": status.get("status", "starting"),
+                "status": result["status"],
                 "pid": result["pid"],
                 "message": f"Video generation started. Use veo_check_generation with session_id '{result['session_id']}' to monitor progress.",
                 "model": model,
@@ -244,6 +320,7 @@ def register_tools(mcp: FastMCP, config: Config):
         to directly query Google's API for the operation status.
         """
         try:
+            generation_manager = await asyncio.to_thread(get_generation_manager)
             result = await asyncio.to_thread(generation_manager.get_status, session_id)
 
             if "error" in result and result["error"] == "Generation session not found":
@@ -271,30 +348,7 @@ def register_tools(mcp: FastMCP, config: Config):
         Shows all subprocess-based generation sessions with their current status.
         """
         try:
-            result = await asyncio.to_thread(generation_manager.list_generations, active_only=active_only)
-
-            # Format for display
-            generations = []
-            for gen in result:
-                gen_info = {
-                    "session_id": gen["session_id"],
-                    "status": gen["status"],
-                    "progress": gen.get("progress", ""),
-                    "prompt": (gen["prompt"][:100] + "..." if len(gen["prompt"]) > 100 else gen["prompt"]),
-                    "model": gen["model"],
-                    "started_at": gen["started_at"],
-                    "pid": gen.get("pid"),
-                }
-
-                # Add video count if completed
-                if gen["status"] == "completed":
-                    gen_info["video_count"] = len(gen.get("videos", []))
-
-                # Add error if failed
-                if gen.get("error"):
-                    gen_info["error"] = gen["error"][:100] + "..." if len(gen["error"]) > 100 else gen["error"]
-
-                generations.append(gen_info)
+            generations = await list_formatted_sessions(active_only)
 
             return {
                 "generations": generations,
@@ -318,30 +372,7 @@ def register_tools(mcp: FastMCP, config: Config):
         Shows all subprocess-based generation sessions with their current status.
         """
         try:
-            result = await asyncio.to_thread(generation_manager.list_generations, active_only=active_only)
-
-            # Format for display
-            sessions = []
-            for gen in result:
-                session_info = {
-                    "session_id": gen["session_id"],
-                    "status": gen["status"],
-                    "progress": gen.get("progress", ""),
-                    "prompt": (gen["prompt"][:100] + "..." if len(gen["prompt"]) > 100 else gen["prompt"]),
-                    "model": gen["model"],
-                    "started_at": gen["started_at"],
-                    "pid": gen.get("pid"),
-                }
-
-                # Add video count if completed
-                if gen["status"] == "completed":
-                    session_info["video_count"] = len(gen.get("videos", []))
-
-                # Add error if failed
-                if gen.get("error"):
-                    session_info["error"] = gen["error"][:100] + "..." if len(gen["error"]) > 100 else gen["error"]
-
-                sessions.append(session_info)
+            sessions = await list_formatted_sessions(active_only)
 
             return {
                 "sessions": sessions,
@@ -355,14 +386,14 @@ def register_tools(mcp: FastMCP, config: Config):
     @mcp.tool
     async def veo_cleanup_sessions(
         older_than_days: Annotated[
-            Union[int, str],
+            IntParam,
             Field(
                 default=7,
                 description="Delete sessions older than this many days (minimum 1)",
             ),
         ] = 7,
         completed_only: Annotated[
-            Union[bool, str],
+            BoolParam,
             Field(
                 default=True,
                 description="Only cleanup completed/failed sessions",
@@ -375,42 +406,13 @@ def register_tools(mcp: FastMCP, config: Config):
         Removes state files and optionally downloaded videos for old sessions.
         """
         try:
-            # Parse parameters that might come as strings
-            older_than_days = parse_int_param(older_than_days, default=7)
-            completed_only = parse_bool_param(completed_only) if completed_only is not None else True
-
-            cleaned_count = 0
-            cutoff_time = datetime.now().timestamp() - (older_than_days * 24 * 60 * 60)
-
-            sessions = await asyncio.to_thread(generation_manager.list_generations)
-
-            for session in sessions:
-                # Parse session timestamp from ID
-                try:
-                    session_timestamp = int(session["session_id"].split("_")[-1])
-                    if session_timestamp > cutoff_time:
-                        continue  # Too recent
-                except (ValueError, IndexError):
-                    continue
-
-                # Check if should cleanup
-                if completed_only and session["status"] not in [
-                    "completed",
-                    "failed",
-                    "cancelled",
-                ]:
-                    continue
-
-                # Remove state file
-                state_file = generation_manager._get_state_file(session["session_id"])
-                if state_file.exists():
-                    state_file.unlink()
-                    cleaned_count += 1
-
-                # Remove log files
-                log_dir = generation_manager.state_dir / "logs"
-                for log_file in log_dir.glob(f"{session['session_id']}_*.log"):
-                    log_file.unlink(missing_ok=True)
+            generation_manager = await asyncio.to_thread(get_generation_manager)
+
+            cleaned_count = await asyncio.to_thread(
+                generation_manager.cleanup_sessions,
+                older_than_days=older_than_days,
+                completed_only=completed_only,
+            )
 
             return {
                 "success": True,
@@ -421,6 +423,124 @@ def register_tools(mcp: FastMCP, config: Config):
         except Exception as e:
             return {"error": f"Failed to cleanup sessions: {str(e)}"}
 
+    def download_session_video(session_id: str, video_index: int, output_dir: Optional[str]) -> Dict[str, Any]:
+        """Download a video of a completed session (blocking)"""
+        generation_manager = get_generation_manager()
+
+        # Check generation status
+        status = generation_manager.get_status(session_id)
+
+        if not status:
+            return {"error": f"Session '{session_id}' not found", "success": False}
+
+        if status.get("status") != "completed":
+            return {
+                "error": f"Generation not complete. Current status: {status.get('status')}",
+                "success": False,
+            }
+
+        # Check if videos are available
+        videos = status.get("videos", [])
+        if not videos:
+            return {
+                "error": "No videos found in completed generation",
+                "success": False,
+            }
+
+        if video_index >= len(videos):
+            return {
+                "error": f"Video index {video_index} out of range. Only {len(videos)} videos available.",
+                "success": False,
+            }
+
+        # Check if already downloaded
+        downloaded_videos = status.get("downloaded_videos", [])
+        for dv in downloaded_videos:
+            if dv.get("index") == video_index:
+                return {
+                    "file_path": dv.get("file_path"),
+                    "file_size": dv.get("file_size"),
+                    "success": True,
+                    "message": "Video already downloaded",
+                }
+
+        # Get the video URI
+        video = videos[video_index]
+        video_uri = video.get("uri")
+
+        if not video_uri:
+            return {"error": "No video URI found for download", "success": False}
+
+        # Prepare output path
+        if output_dir:
+            output_path = Path(output_dir)
+        else:
+            output_path = Path(config.config_dir) / "downloads" / session_id
+
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        # Generate filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"veo_{session_id}_{video_index}_{timestamp}.mp4"
+        full_path = output_path / filename
+
+        # Get the shared VeoClient and download
+        try:
+            veo_client = _get_veo_client(config.gemini_api_key, config.veo_model)
+
+            # If the video URI is a file path (already downloaded), just copy it
+            if video_uri.startswith("/") and Path(video_uri).exists():
+                import shutil
+
+                shutil.copy2(video_uri, full_path)
+                file_size = full_path.stat().st_size
+                logger.info(f"Copied existing video from {video_uri} to {full_path}")
+            else:
+                # Download from API using the SDK
+                logger.info(f"Downloading video from URI: {video_uri}")
+
+                # Extract file ID from URI
+                file_id = extract_file_id(video_uri)
+                if not file_id:
+                    return {
+                        "error": f"Invalid video URI format: {video_uri}",
+                        "success": False,
+                    }
+                logger.info(f"Extracted file ID: {file_id}")
+
+                # Use the simplified download method
+                download_result = veo_client.download_video_by_file_id(file_id, str(full_path))
+
+                if download_result.get("error"):
+                    return {"error": download_result["error"], "success": False}
+
+                file_size = download_result["file_size"]
+                logger.info(f"Downloaded video to {full_path} using SDK")
+
+            # Record the download in the session's download journal
+            generation_manager.record_download(
+                session_id,
+                {
+                    "index": video_index,
+                    "file_path": str(full_path),
+                    "file_size": file_size,
+                },
+            )
+
+            return {
+                "file_path": str(full_path),
+                "file_size": file_size,
+                "success": True,
+                "message": f"Video downloaded successfully to {full_path}",
+            }
+
+        except Exception as e:
+            logger.error(f"Download failed: {e}")
+            return {
+                "error": f"Failed to download video: {str(e)}",
+                "success": False,
+            }
+
     @mcp.tool
     async def veo_download_video(
         session_id: Annotated[
@@ -430,7 +550,7 @@ def register_tools(mcp: FastMCP, config: Config):
             ),
         ],
         video_index: Annotated[
-            Union[int, str],
+            IntParam,
             Field(
                 default=0,
                 description="Index of the video to download (for multiple samples, 0-based)",
@@ -461,127 +581,8 @@ def register_tools(mcp: FastMCP, config: Config):
         - success: Whether download was successful
         """
         try:
-            # Parse parameters that might come as strings
-            video_index = parse_int_param(video_index, default=0)
-
-            # Check generation status
-            status = generation_manager.get_status(session_id)
-
-            if not status:
-                return {"error": f"Session '{session_id}' not found", "success": False}
-
-            if status.get("status") != "completed":
-                return {
-                    "error": f"Generation not complete. Current status: {status.get('status')}",
-                    "success": False,
-                }
-
-            # Check if videos are available
-            videos = status.get("videos", [])
-            if not videos:
-                return {
-                    "error": "No videos found in completed generation",
-                    "success": False,
-                }
-
-            if video_index >= len(videos):
-                return {
-                    "error": f"Video index {video_index} out of range. Only {len(videos)} videos available.",
-                    "success": False,
-                }
-
-            # Check if already downloaded
-            downloaded_videos = status.get("downloaded_videos", [])
-            for dv in downloaded_videos:
-                if dv.get("index") == video_index:
-                    return {
-                        "file_path": dv.get("file_path"),
-                        "file_size": dv.get("file_size"),
-                        "success": True,
-                        "message": "Video already downloaded",
-                    }
-
-            # Get the video URI
-            video = videos[video_index]
-            video_uri = video.get("uri")
-
-            if not video_uri:
-                return {"error": "No video URI found for download", "success": False}
-
-            # Prepare output path
-            if output_dir:
-                output_path = Path(output_dir)
-            else:
-                output_path = Path(config.config_dir) / "downloads" / session_id
-
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"veo_{session_id}_{video_index}_{timestamp}.mp4"
-            full_path = output_path / filename
-
-            # Initialize VeoClient and download
-            try:
-                veo_client = VeoClient(config.gemini_api_key, config.veo_model)
-
-                # If the video URI is a file path (already downloaded), just copy it
-                if video_uri.startswith("/") and Path(video_uri).exists():
-                    import shutil
-
-                    shutil.copy2(video_uri, full_path)
-                    logger.info(f"Copied existing video from {video_uri} to {full_path}")
-                else:
-                    # Download from API using the SDK
-                    logger.info(f"Downloading video from URI: {video_uri}")
-
-                    # Extract file ID from URI
-                    # URI format: https://generativelanguage.googleapis.com/v1beta/files/FILE_ID:download?alt=media
-                    if "files/" in video_uri and ":download" in video_uri:
-                        file_id = video_uri.split("files/")[1].split(":download")[0]
-                        logger.info(f"Extracted file ID: {file_id}")
-
-                        # Use the simplified download method
-                        download_result = veo_client.download_video_by_file_id(file_id, str(full_path))
-
-                        if download_result.get("error"):
-                            return {"error": download_result["error"], "success": False}
-
-                        logger.info(f"Downloaded video to {full_path} using SDK")
-                    else:
-                        return {
-                            "error": f"Invalid video URI format: {video_uri}",
-                            "success": False,
-                        }
-
-                # Get file size
-                file_size = full_path.stat().st_size
-
-                # Update status with download info
-                downloaded_videos.append(
-                    {
-                        "index": video_index,
-                        "file_path": str(full_path),
-                        "file_size": file_size,
-                    }
-                )
-
-                # Update the state file
-                generation_manager._update_session_state(session_id, {"downloaded_videos": downloaded_videos})
-
-                return {
-                    "file_path": str(full_path),
-                    "file_size": file_size,
-                    "success": True,
-                    "message": f"Video downloaded successfully to {full_path}",
-                }
-
-            except Exception as e:
-                logger.error(f"Download failed: {e}")
-                return {
-                    "error": f"Failed to download video: {str(e)}",
-                    "success": False,
-                }
+            # The status read, file copy and HTTP download all block, so run them in a thread
+            return await asyncio.to_thread(download_session_video, session_id, video_index, output_dir)
 
         except Exception as e:
             return {"error": f"Download error: {str(e)}", "success": False}
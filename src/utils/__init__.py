@@ -1,7 +1,38 @@
 """Utility modules for Veo MCP server"""
 
-from .common import parse_bool_param, parse_int_param
-from .generation_manager import GenerationManager
-from .veo_client import VeoClient
+import importlib
 
-__all__ = ["VeoClient", "GenerationManager", "parse_bool_param", "parse_int_param"]
+from .common import (
+    BoolParam,
+    IntParam,
+    OptionalIntParam,
+    parse_bool_param,
+    parse_int_param,
+)
+
+# Exports resolved on first access; veo_client imports google.genai, which is
+# slow to import and not needed by every submodule user (PEP 562)
+_LAZY_EXPORTS = {
+    "GenerationManager": ".generation_manager",
+    "VeoClient": ".veo_client",
+}
+
+__all__ = [
+    "VeoClient",
+    "GenerationManager",
+    "BoolParam",
+    "IntParam",
+    "OptionalIntParam",
+    "parse_bool_param",
+    "parse_int_param",
+]
+
+
+def __getattr__(name: str):
+    """Import a lazily exported name on first access"""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
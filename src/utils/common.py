@@ -1,6 +1,29 @@
 """Common utility functions for MCP tools"""
 
-from typing import Optional, Union
+from typing import Annotated, Any, Optional, TypeAlias, Union
+
+from pydantic import BeforeValidator
+
+# String values accepted as boolean true (anything else parses as false)
+_TRUE_STRINGS = frozenset({"true", "True", "TRUE", "1", "yes", "on"})
+
+
+def _identity(value):
+    return value
+
+
+def _parse_int_str(value: str, default: Optional[int]) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+# Parsers keyed by the exact type of the incoming value
+_BOOL_PARSERS = {
+    bool: _identity,
+    str: _TRUE_STRINGS.__contains__,
+}
 
 
 def parse_bool_param(value: Union[bool, str, None]) -> Optional[bool]:
@@ -15,13 +38,8 @@ def parse_bool_param(value: Union[bool, str, None]) -> Optional[bool]:
     Returns:
         Parsed boolean value or None
     """
-    if value is None:
-        return None
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, str):
-        return value.lower() == "true"
-    return None
+    parser = _BOOL_PARSERS.get(type(value))
+    return parser(value) if parser is not None else None
 
 
 def parse_int_param(value: Union[int, str, None], default: Optional[int] = None) -> Optional[int]:
@@ -37,13 +55,25 @@ def parse_int_param(value: Union[int, str, None], default: Optional[int] = None)
     Returns:
         Parsed integer value, default, or None
     """
-    if value is None:
-        return default
-    if isinstance(value, int):
+    value_type = type(value)
+    if value_type is int or value_type is bool:
         return value
-    if isinstance(value, str):
-        try:
-            return int(value)
-        except ValueError:
-            return default
+    if value_type is str:
+        return _parse_int_str(value, default)
     return default
+
+
+def _coerce_int_param(value: Any) -> Any:
+    # Unparseable strings are passed through, so validation reports the input as sent
+    return _parse_int_str(value, value) if isinstance(value, str) else value
+
+
+def _coerce_bool_param(value: Any) -> Any:
+    return parse_bool_param(value) if isinstance(value, str) else value
+
+
+# Tool parameter types that accept string-encoded values from MCP clients.
+# Coercion runs inside pydantic validation, before the tool body is called.
+IntParam: TypeAlias = Annotated[int, BeforeValidator(_coerce_int_param)]
+OptionalIntParam: TypeAlias = Optional[IntParam]
+BoolParam: TypeAlias = Annotated[bool, BeforeValidator(_coerce_bool_param)]
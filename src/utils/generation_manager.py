@@ -1,92 +1,417 @@
 """Generation Manager for handling background video generation processes"""
 
-import json
 import logging
 import os
+import resource
+import secrets
+import select
 import signal
 import subprocess
 import sys
+import threading
 import time
-import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import psutil
+import orjson
+
+from ..config import Config
+from .json_io import load_json, load_json_with_stat, write_json_atomic
+from .worker_pool import WorkerPool
 
 logger = logging.getLogger(__name__)
 
+# Statuses in which a worker process is expected to be alive
+RUNNING_STATUSES = frozenset({"running", "generating", "polling"})
+# Statuses of sessions that have not finished yet
+ACTIVE_STATUSES = RUNNING_STATUSES | {"starting"}
+# Seconds after which a temporary file from an atomic state write is considered abandoned
+STALE_TEMP_FILE_AGE = 3600
+# State fields kept in the state index, enough for session listings and liveness checks
+SUMMARY_FIELDS = (
+    "session_id",
+    "status",
+    "progress",
+    "prompt",
+    "model",
+    "started_at",
+    "updated_at",
+    "pid",
+    "pid_starttime",
+    "error",
+)
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as an ISO 8601 string with a Z suffix"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _read_proc_stat(pid: int) -> List[bytes]:
+    """Read the fields of /proc/<pid>/stat that follow the command name (Linux)
+
+    The first returned field is the process state (field 3 in proc(5)); the
+    command name is skipped as it may itself contain spaces or parentheses.
+    """
+    with open(f"/proc/{pid}/stat", "rb") as f:
+        return f.read().rpartition(b")")[2].split()
+
+
+def _read_starttime(pid: int) -> Optional[int]:
+    """Get a process's start time in clock ticks since boot, or None if unavailable"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return int(_read_proc_stat(pid)[19])  # starttime, field 22 in proc(5)
+    except (OSError, IndexError, ValueError):
+        return None
+
 
 class GenerationManager:
     """Manages background video generation processes"""
 
-    def __init__(self, state_dir: str = "/tmp/veo-generations"):
+    # Snapshot of parsed session states, used to skip re-parsing unchanged state files
+    INDEX_FILE = ".index.json"
+
+    def __init__(self, state_dir: str = "/tmp/veo-generations", config: Optional[Config] = None):
         self.state_dir = Path(state_dir)
         self.state_dir.mkdir(parents=True, exist_ok=True)
+        # Server config, loaded from the environment on first use if not given
+        self._config = config
+        # session_id -> {"mtime_ns", "size", "summary"}, loaded on first listing
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        # session_id -> (mtime_ns, size) of the event journal folded into the summary;
+        # kept in memory only, so journal appends never rewrite the index file
+        self._index_events: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._index_lock = threading.Lock()
+        # Pre-started workers, filled after the first generation
+        self._pool = WorkerPool()
+        # session_id -> (pid, pidfd) of workers started by this manager, polled
+        # together for liveness. Capped at half the fd limit to leave room for others
+        self._pidfds: Dict[str, Tuple[int, int]] = {}
+        self._pidfds_lock = threading.Lock()
+        self._max_pidfds = resource.getrlimit(resource.RLIMIT_NOFILE)[0] // 2
 
     def _get_state_file(self, session_id: str) -> Path:
         """Get path to state file for a session"""
         return self.state_dir / f"{session_id}.json"
 
+    def _get_downloads_file(self, session_id: str) -> Path:
+        """Get path to the download journal for a session"""
+        return self.state_dir / f"{session_id}.downloads.jsonl"
+
+    def _get_events_file(self, session_id: str) -> Path:
+        """Get path to the progress event journal for a session"""
+        return self.state_dir / f"{session_id}.events.jsonl"
+
+    def _apply_events(self, session_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold progress events journaled since the last snapshot into a session state"""
+        try:
+            with open(self._get_events_file(session_id), "rb") as f:
+                for line in f:
+                    try:
+                        state.update(orjson.loads(line))
+                    except ValueError:
+                        continue  # Skip a partially written line
+        except FileNotFoundError:
+            pass
+        return state
+
+    def _read_downloads(self, session_id: str) -> List[Dict[str, Any]]:
+        """Read download records from the session's download journal"""
+        downloads = []
+        try:
+            with open(self._get_downloads_file(session_id), "rb") as f:
+                for line in f:
+                    try:
+                        downloads.append(orjson.loads(line))
+                    except ValueError:
+                        continue  # Skip a partially written line
+        except FileNotFoundError:
+            pass
+        return downloads
+
     def _read_state(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Read state from file"""
         state_file = self._get_state_file(session_id)
         if state_file.exists():
             try:
-                with open(state_file, "r") as f:
-                    return json.load(f)
+                state = load_json(state_file)
             except Exception:
                 return None
+            return self._apply_events(session_id, state) if isinstance(state, dict) else None
         return None
 
-    def _write_state(self, session_id: str, state: Dict[str, Any]):
-        """Write state to file atomically"""
-        state_file = self._get_state_file(session_id)
-        temp_file = state_file.with_suffix(".tmp")
+    def _write_state(self, session_id: str, state: Dict[str, Any], durable: bool = False):
+        """Write state to file atomically
 
-        try:
-            # Write to temporary file first
-            with open(temp_file, "w") as f:
-                json.dump(state, f, indent=2)
+        Pass durable=True for writes that must survive a crash (the initial
+        running state and terminal statuses); progress updates skip the fsync.
+        """
+        write_json_atomic(self._get_state_file(session_id), state, durable=durable)
 
-            # Atomically replace the original file
-            # On POSIX systems, this is atomic
-            temp_file.replace(state_file)
+    def _write_final_state(self, session_id: str, state: Dict[str, Any]):
+        """Durably write the final state of a session whose worker has exited
+
+        The state already has the journaled events folded in, so the event
+        journal is removed once the snapshot is written.
+        """
+        self._write_state(session_id, state, durable=True)
+        self._get_events_file(session_id).unlink(missing_ok=True)
+
+    @staticmethod
+    def _summarize(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce a session state to the fields kept in the state index"""
+        summary = {field: state[field] for field in SUMMARY_FIELDS if field in state}
+        summary["video_count"] = len(state.get("videos") or [])
+        return summary
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        """Read the state index snapshot, returning an empty index if unavailable"""
+        try:
+            index = load_json(self.state_dir / self.INDEX_FILE)
         except Exception:
-            # Clean up temp file on error
-            temp_file.unlink(missing_ok=True)
-            raise
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        return {session_id: entry for session_id, entry in index.items() if "summary" in entry}
+
+    def _load_states(self) -> Dict[str, Dict[str, Any]]:
+        """Load summaries of all session states, re-parsing only files changed since the last snapshot
+
+        Progress appended to a session's event journal is folded into its summary
+        in memory; the index file is rewritten only when a state file changes.
+        """
+        with self._index_lock:
+            if self._index is None:
+                self._index = self._read_index()
+            index = self._index
+
+            changed = False
+            seen = set()
+            state_entries = []
+            event_entries = {}
+            with os.scandir(self.state_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith("gen_"):
+                        continue
+                    if entry.name.endswith(".events.jsonl"):
+                        event_entries[entry.name[: -len(".events.jsonl")]] = entry
+                    elif entry.name.endswith(".json"):
+                        state_entries.append(entry)
+
+            for entry in state_entries:
+                session_id = entry.name[: -len(".json")]
+                try:
+                    stat = entry.stat()
+                    events_entry = event_entries.get(session_id)
+                    events_stat = events_entry.stat() if events_entry else None
+                except FileNotFoundError:
+                    continue
+                seen.add(session_id)
+                events_key = (events_stat.st_mtime_ns, events_stat.st_size) if events_stat else None
+
+                cached = index.get(session_id)
+                if cached and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get("size") == stat.st_size:
+                    if session_id in self._index_events and self._index_events[session_id] == events_key:
+                        continue
+                    # Only the journal changed; journaled events postdate the snapshot
+                    # and carry whole field values, so folding all of them again is safe
+                    if events_key:
+                        events = self._apply_events(session_id, {})
+                        cached["summary"].update({key: events[key] for key in SUMMARY_FIELDS if key in events})
+                    self._index_events[session_id] = events_key
+                    continue
+
+                # Read the whole file in one go; key the index on the stat of what was read
+                try:
+                    state, stat = load_json_with_stat(entry.path)
+                except Exception:
+                    state = None
+                if not isinstance(state, dict):
+                    index.pop(session_id, None)
+                    self._index_events.pop(session_id, None)
+                    seen.discard(session_id)
+                else:
+                    if events_key:
+                        state = self._apply_events(session_id, state)
+                    index[session_id] = {
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "summary": self._summarize(state),
+                    }
+                    self._index_events[session_id] = events_key
+                changed = True
+
+            # Drop sessions whose state files were removed
+            for session_id in index.keys() - seen:
+                del index[session_id]
+                self._index_events.pop(session_id, None)
+                changed = True
+
+            if changed:
+                try:
+                    write_json_atomic(self.state_dir / self.INDEX_FILE, index, indent=False)
+                except Exception as e:
+                    logger.debug(f"Failed to write state index: {e}")
+
+            return {session_id: dict(entry["summary"]) for session_id, entry in index.items()}
 
-    def _is_process_running(self, pid: int) -> bool:
-        """Check if a process is still running"""
+    def _is_process_running(self, pid: int, starttime: Optional[int] = None) -> bool:
+        """Check if a process is still running
+
+        Args:
+            pid: Process ID of the worker
+            starttime: Start time recorded when the worker was launched; when given,
+                the process identity is checked against it instead of its cmdline
+        """
         try:
             # Check if process exists
             os.kill(pid, 0)
-            # Verify it's actually our generation process
-            try:
-                proc = psutil.Process(pid)
-                # Check if process is zombie
-                if proc.status() == psutil.STATUS_ZOMBIE:
+        except OSError:
+            # Process doesn't exist, try to reap it if it's a zombie
+            self._reap(pid)
+            return False
+
+        # Verify it's actually our generation process
+        if sys.platform.startswith("linux"):
+            if starttime is not None:
+                return self._is_worker_process_stat(pid, starttime)
+            return self._is_worker_process_proc(pid)
+        return self._is_worker_process_psutil(pid)
+
+    def _reap(self, pid: int):
+        """Reap a child process to prevent a zombie"""
+        try:
+            os.waitpid(pid, os.WNOHANG)
+        except (OSError, ChildProcessError):
+            pass
+
+    def _is_worker_process_stat(self, pid: int, starttime: int) -> bool:
+        """Check a live pid is our worker by its start time, which a reused pid cannot match (Linux)"""
+        try:
+            fields = _read_proc_stat(pid)
+        except (FileNotFoundError, ProcessLookupError):
+            return False
+        except OSError as e:
+            logger.debug(f"Error checking process {pid}: {e}")
+            return True  # Process exists but can't verify, assume it's ours
+
+        if fields[0] == b"Z":
+            logger.warning(f"Process {pid} is a zombie, attempting to reap")
+            self._reap(pid)
+            return False
+        return int(fields[19]) == starttime
+
+    def _is_worker_process_proc(self, pid: int) -> bool:
+        """Check a live pid is our worker by reading /proc directly (Linux)"""
+        try:
+            # The State line is within the first few lines of the status file
+            with open(f"/proc/{pid}/status", "rb") as f:
+                if b"State:\tZ" in f.read(256):
                     logger.warning(f"Process {pid} is a zombie, attempting to reap")
-                    try:
-                        os.waitpid(pid, os.WNOHANG)
-                    except (OSError, ChildProcessError):
-                        pass
+                    self._reap(pid)
                     return False
-                cmdline = " ".join(proc.cmdline())
-                return "generation_worker" in cmdline  # More flexible matching
-            except psutil.NoSuchProcess:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                return b"generation_worker" in f.read()
+        except (FileNotFoundError, ProcessLookupError):
+            return False
+        except OSError as e:
+            logger.debug(f"Error checking process {pid}: {e}")
+            return True  # Process exists but can't verify, assume it's ours
+
+    def _is_worker_process_psutil(self, pid: int) -> bool:
+        """Check a live pid is our worker using psutil (non-Linux platforms)"""
+        import psutil  # Imported on first use; Linux checks read /proc and never need it
+
+        try:
+            proc = psutil.Process(pid)
+            # Check if process is zombie
+            if proc.status() == psutil.STATUS_ZOMBIE:
+                logger.warning(f"Process {pid} is a zombie, attempting to reap")
+                self._reap(pid)
                 return False
-            except Exception as e:
-                logger.debug(f"Error checking process {pid}: {e}")
-                return True  # Process exists but can't verify, assume it's ours
-        except OSError:
-            # Process doesn't exist, try to reap it if it's a zombie
-            try:
-                os.waitpid(pid, os.WNOHANG)
-            except (OSError, ChildProcessError):
-                pass
+            cmdline = " ".join(proc.cmdline())
+            return "generation_worker" in cmdline  # More flexible matching
+        except psutil.NoSuchProcess:
             return False
+        except Exception as e:
+            logger.debug(f"Error checking process {pid}: {e}")
+            return True  # Process exists but can't verify, assume it's ours
+
+    def _track_pidfd(self, session_id: str, pid: int):
+        """Keep a pidfd for a started worker, if supported and within the fd budget"""
+        if not hasattr(os, "pidfd_open"):
+            return
+        with self._pidfds_lock:
+            if len(self._pidfds) >= self._max_pidfds:
+                return  # Liveness of this session falls back to _is_process_running
+            try:
+                self._pidfds[session_id] = (pid, os.pidfd_open(pid))
+            except OSError as e:
+                logger.debug(f"Could not open pidfd for process {pid}: {e}")
+
+    def _poll_pidfds(self) -> Dict[str, bool]:
+        """Check liveness of all tracked workers with a single poll() call
+
+        Returns:
+            Mapping of session ID to whether its worker is running. Sessions
+            without a tracked worker are absent. Exited workers are reaped and
+            their pidfds closed.
+        """
+        with self._pidfds_lock:
+            if not self._pidfds:
+                return {}
+            poller = select.poll()
+            fd_sessions = {}
+            for session_id, (_, pidfd) in self._pidfds.items():
+                poller.register(pidfd, select.POLLIN)
+                fd_sessions[pidfd] = session_id
+
+            # POLLIN is reported once a process has terminated
+            running = dict.fromkeys(self._pidfds, True)
+            for pidfd, _ in poller.poll(0):
+                session_id = fd_sessions[pidfd]
+                pid, _ = self._pidfds.pop(session_id)
+                os.close(pidfd)
+                self._reap(pid)
+                running[session_id] = False
+            return running
+
+    def _wait_for_exit(self, pid: int, timeout: float) -> bool:
+        """Wait up to timeout seconds for a process to exit
+
+        Uses a pidfd where available, so the wait is a single poll() call instead
+        of repeated liveness checks. Returns True if the process has exited.
+        """
+        if hasattr(os, "pidfd_open"):
+            try:
+                pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                return True
+            except OSError:
+                pidfd = None  # pidfd not supported by the kernel, use the fallback below
+
+            if pidfd is not None:
+                try:
+                    poller = select.poll()
+                    poller.register(pidfd, select.POLLIN)
+                    # POLLIN is reported once the process has terminated
+                    return bool(poller.poll(int(timeout * 1000)))
+                finally:
+                    os.close(pidfd)
+
+        # Fallback: check the process with exponentially growing intervals, so a
+        # quick exit is noticed early and a slow one costs only a few checks
+        delay = 0.01
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            if not self._is_process_running(pid):
+                return True
+            time.sleep(min(delay, remaining))
+            delay *= 2
+        return not self._is_process_running(pid)
 
     def start_generation(
         self,
@@ -109,10 +434,11 @@ class GenerationManager:
         """Start a new generation process"""
 
         # Generate session ID
-        session_id = f"gen_{uuid.uuid4().hex[:8]}_{int(time.time())}"
+        session_id = f"gen_{secrets.token_hex(4)}_{int(time.time())}"
         logger.info(f"Starting new generation session: {session_id}")
 
         # Create initial state
+        now = _utc_timestamp()
         state = {
             "session_id": session_id,
             "status": "starting",
@@ -122,8 +448,8 @@ class GenerationManager:
             "image_path": image_path,
             "number_of_videos": number_of_videos,
             "videos": [],
-            "started_at": datetime.utcnow().isoformat() + "Z",
-            "updated_at": datetime.utcnow().isoformat() + "Z",
+            "started_at": now,
+            "updated_at": now,
             "pid": None,
             "error": None,
             "generation_config": {
@@ -171,29 +497,26 @@ class GenerationManager:
             str(number_of_videos),
         ]
 
-        if prompt:
-            cmd.extend(["--prompt", prompt])
-        if image_path:
-            cmd.extend(["--image-path", image_path])
-
-        if negative_prompt:
-            cmd.extend(["--negative-prompt", negative_prompt])
-        if resolution:
-            cmd.extend(["--resolution", resolution])
-        if duration_seconds is not None:
-            cmd.extend(["--duration-seconds", str(duration_seconds)])
-        if seed is not None:
-            cmd.extend(["--seed", str(seed)])
-        if output_gcs_uri:
-            cmd.extend(["--output-gcs-uri", output_gcs_uri])
-        if enhance_prompt:
-            cmd.append("--enhance-prompt")
-        if generate_audio:
-            cmd.append("--generate-audio")
-        if fps is not None:
-            cmd.extend(["--fps", str(fps)])
-        if download_path:
-            cmd.extend(["--download-path", download_path])
+        # Optional worker arguments; None and empty-string values are left out
+        options = (
+            ("--prompt", prompt),
+            ("--image-path", image_path),
+            ("--negative-prompt", negative_prompt),
+            ("--resolution", resolution),
+            ("--duration-seconds", duration_seconds),
+            ("--seed", seed),
+            ("--output-gcs-uri", output_gcs_uri),
+            ("--fps", fps),
+            ("--download-path", download_path),
+        )
+        flags = (
+            ("--enhance-prompt", enhance_prompt),
+            ("--generate-audio", generate_audio),
+        )
+        for option, value in options:
+            if value is not None and value != "":
+                cmd.extend((option, str(value)))
+        cmd.extend([option for option, enabled in flags if enabled])
 
         # Start subprocess
         try:
@@ -202,52 +525,78 @@ class GenerationManager:
 
             # Pass API key securely via environment
             env = os.environ.copy()
-            # Get API key from Config
-            from ..config import Config
-
-            config = Config.from_env()
-            env["GEMINI_API_KEY"] = config.gemini_api_key
+            if self._config is None:
+                self._config = Config.from_env()
+            env["GEMINI_API_KEY"] = self._config.gemini_api_key
 
-            # Create log files for subprocess output
+            # Log files for subprocess output
             log_dir = self.state_dir / "logs"
             log_dir.mkdir(exist_ok=True)
-            stdout_log = open(log_dir / f"{session_id}_stdout.log", "w")
-            stderr_log = open(log_dir / f"{session_id}_stderr.log", "w")
-
-            proc = subprocess.Popen(
-                cmd,
-                stdout=stdout_log,
-                stderr=stderr_log,
-                start_new_session=True,  # Detach from parent process group
-                cwd=str(project_root),  # Set working directory to project root
-                env=env,  # Pass environment
-            )
-
-            # Close file handles in parent process
-            stdout_log.close()
-            stderr_log.close()
-
-            # Update state with PID
-            state["pid"] = proc.pid
+            stdout_path = log_dir / f"{session_id}_stdout.log"
+            stderr_path = log_dir / f"{session_id}_stderr.log"
+
+            # Prefer a pre-started worker, which skips interpreter startup and imports
+            pooled = self._pool.acquire()
+            job_sock = None
+            if pooled is not None:
+                pid, job_sock = pooled
+            else:
+                stdout_log = open(stdout_path, "w")
+                stderr_log = open(stderr_path, "w")
+
+                # CPython launches the child with vfork(), so the server's memory is not
+                # copied. Descriptors are non-inheritable by default (PEP 446), so the
+                # close-all-fds pass in the child is skipped; the stdio pipes the MCP
+                # server speaks over are kept away from the worker via stdin=DEVNULL.
+                proc = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=stdout_log,
+                    stderr=stderr_log,
+                    close_fds=False,
+                    start_new_session=True,  # Detach from parent process group
+                    cwd=str(project_root),  # Set working directory to project root
+                    env=env,  # Pass environment
+                )
+                pid = proc.pid
+
+                # Close file handles in parent process
+                stdout_log.close()
+                stderr_log.close()
+
+            # Update state with PID; its start time identifies the process in liveness checks
+            state["pid"] = pid
+            state["pid_starttime"] = _read_starttime(pid)
+            self._track_pidfd(session_id, pid)
             state["status"] = "running"
             state["progress"] = "subprocess started"
-            self._write_state(session_id, state)
-            logger.info(f"Started subprocess with PID {proc.pid} for session {session_id}")
+            self._write_state(session_id, state, durable=True)
+            logger.info(f"Started subprocess with PID {pid} for session {session_id}")
 
-            return {
-                "session_id": session_id,
-                "status": "started",
-                "pid": proc.pid,
-                "message": "Video generation started in background",
-            }
+            # A pooled worker gets its job only now, so its own state writes follow the one above
+            if job_sock is not None:
+                WorkerPool.send_job(job_sock, cmd[3:], stdout_path, stderr_path)
+                job_sock = None
 
         except Exception as e:
             logger.error(f"Failed to start generation subprocess: {e}")
+            if job_sock is not None:
+                job_sock.close()  # The pooled worker exits when its socket closes without a job
             state["status"] = "failed"
             state["error"] = str(e)
-            self._write_state(session_id, state)
+            self._write_state(session_id, state, durable=True)
             return {"session_id": session_id, "status": "failed", "error": str(e)}
 
+        # Replace the used worker ahead of the next generation; the job above is already running
+        self._pool.fill(str(project_root), env)
+
+        return {
+            "session_id": session_id,
+            "status": state["status"],
+            "pid": pid,
+            "message": "Video generation started in background",
+        }
+
     def get_status(self, session_id: str) -> Dict[str, Any]:
         """Get status of a generation"""
         state = self._read_state(session_id)
@@ -256,46 +605,132 @@ class GenerationManager:
             return {"error": "Generation session not found", "session_id": session_id}
 
         # Check if process is still running
-        if state.get("pid") and state["status"] in ["running", "generating", "polling"]:
-            if not self._is_process_running(state["pid"]):
-                # Process died unexpectedly
-                if state["status"] != "completed" and not state.get("error"):
-                    state["status"] = "failed"
-                    state["error"] = "Generation process terminated unexpectedly"
-                    self._write_state(session_id, state)
+        if state.get("pid") and state["status"] in RUNNING_STATUSES:
+            running = self._poll_pidfds().get(session_id)
+            if running is None:
+                running = self._is_process_running(state["pid"], state.get("pid_starttime"))
+            if not running:
+                state = self._mark_failed(session_id) or state
+
+        # Merge downloads recorded in the download journal (after any state write, so
+        # the journal's records are never copied into the state file)
+        downloads = self._read_downloads(session_id)
+        if downloads:
+            state["downloaded_videos"] = state.get("downloaded_videos", []) + downloads
+
+        return state
 
+    def _mark_failed(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Persist a failed status for a session whose worker died before finishing
+
+        The state is read again after the liveness check, since the worker may have
+        written its final status and exited after the caller read it. A session
+        that is no longer running is left as it is.
+
+        Returns:
+            Current state of the session, or None if it no longer exists
+        """
+        state = self._read_state(session_id)
+        if state is not None and state["status"] in RUNNING_STATUSES:
+            state["status"] = "failed"
+            if not state.get("error"):
+                state["error"] = "Generation process terminated unexpectedly"
+            self._write_final_state(session_id, state)
         return state
 
     def list_generations(self, active_only: bool = False) -> List[Dict[str, Any]]:
-        """List all generation sessions"""
+        """List all generation sessions as summaries of their states (see SUMMARY_FIELDS)"""
         generations = []
-
-        for state_file in self.state_dir.glob("gen_*.json"):
-            session_id = state_file.stem
-            state = self._read_state(session_id)
-
-            if state:
-                # Update status for running processes
-                if state.get("pid") and state["status"] in [
-                    "running",
-                    "generating",
-                    "polling",
-                ]:
-                    if not self._is_process_running(state["pid"]):
-                        state["status"] = "failed" if state["status"] != "completed" else state["status"]
-
-                if not active_only or state["status"] in [
-                    "running",
-                    "generating",
-                    "polling",
-                    "starting",
-                ]:
-                    generations.append(state)
+        # Liveness per (pid, start time), so each process is probed at most once per listing
+        pid_running: Dict[Tuple[int, Optional[int]], bool] = {}
+        # Workers started by this manager are all checked with one poll() call
+        session_running = self._poll_pidfds()
+
+        for session_id, state in self._load_states().items():
+            if not state:
+                continue
+
+            # Update status for running processes; terminal sessions need no probe.
+            # Dead workers are marked failed on disk, so later listings skip the probe
+            pid = state.get("pid")
+            if pid and state["status"] in RUNNING_STATUSES:
+                running = session_running.get(session_id)
+                if running is None:
+                    process_key = (pid, state.get("pid_starttime"))
+                    if process_key not in pid_running:
+                        pid_running[process_key] = self._is_process_running(*process_key)
+                    running = pid_running[process_key]
+                if not running:
+                    current_state = self._mark_failed(session_id)
+                    if current_state is not None:
+                        state = self._summarize(current_state)
+
+            if not active_only or state["status"] in ACTIVE_STATUSES:
+                generations.append(state)
 
         # Sort by start time, newest first
         generations.sort(key=lambda x: x.get("started_at", ""), reverse=True)
         return generations
 
+    def cleanup_sessions(self, older_than_days: int = 7, completed_only: bool = True) -> int:
+        """Remove state and log files of sessions older than the given age, and abandoned temp files
+
+        Returns:
+            Number of sessions removed
+        """
+        now = time.time()
+        cutoff_time = now - older_than_days * 86400
+
+        # Collect old sessions and temporary files in a single pass over the state directory
+        state_files = {}
+        temp_files = []
+        with os.scandir(self.state_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("gen_") and entry.name.endswith(".json"):
+                    state_files[entry.name[: -len(".json")]] = entry.path
+                elif entry.name.endswith(".tmp"):
+                    temp_files.append(entry)
+
+        cleaned = set()
+        for session_id, state_path in state_files.items():
+            # Parse session timestamp from ID (the part after the last underscore)
+            session_timestamp = session_id.rpartition("_")[2]
+            if not session_timestamp.isdigit() or int(session_timestamp) > cutoff_time:
+                continue  # Malformed ID or too recent
+
+            # Check if should cleanup
+            if completed_only and self.get_status(session_id).get("status") not in [
+                "completed",
+                "failed",
+                "cancelled",
+            ]:
+                continue
+
+            Path(state_path).unlink(missing_ok=True)
+            self._get_downloads_file(session_id).unlink(missing_ok=True)
+            self._get_events_file(session_id).unlink(missing_ok=True)
+            cleaned.add(session_id)
+
+        # Remove temporary files left by writers that died before renaming them:
+        # those of cleaned sessions, and any old enough that no write is in progress
+        for entry in temp_files:
+            try:
+                stale = now - entry.stat().st_mtime > STALE_TEMP_FILE_AGE
+            except FileNotFoundError:
+                continue  # Renamed by its writer meanwhile
+            if stale or entry.name.partition(".json.")[0] in cleaned:
+                Path(entry.path).unlink(missing_ok=True)
+
+        # Remove log files of cleaned sessions in a single pass over the log directory
+        log_dir = self.state_dir / "logs"
+        if cleaned and log_dir.is_dir():
+            with os.scandir(log_dir) as entries:
+                log_files = [entry.path for entry in entries if entry.name[: entry.name.rfind("_")] in cleaned]
+            for log_file in log_files:
+                Path(log_file).unlink(missing_ok=True)
+
+        return len(cleaned)
+
     def cancel_generation(self, session_id: str) -> Dict[str, Any]:
         """Cancel a generation"""
         state = self._read_state(session_id)
@@ -303,7 +738,7 @@ class GenerationManager:
         if not state:
             return {"error": "Generation session not found", "session_id": session_id}
 
-        if state["status"] not in ["running", "generating", "polling", "starting"]:
+        if state["status"] not in ACTIVE_STATUSES:
             return {
                 "error": f"Cannot cancel generation in status: {state['status']}",
                 "session_id": session_id,
@@ -319,22 +754,16 @@ class GenerationManager:
                 logger.info(f"Sent SIGTERM to process {pid} for session {session_id}")
 
                 # Wait up to 5 seconds for process to terminate
-                for _ in range(50):
-                    if not self._is_process_running(pid):
-                        break
-                    time.sleep(0.1)
+                exited = self._wait_for_exit(pid, 5.0)
 
                 # Force kill if still running
-                if self._is_process_running(pid):
+                if not exited and self._is_process_running(pid, state.get("pid_starttime")):
                     os.kill(pid, signal.SIGKILL)
-                    time.sleep(0.1)
+                    self._wait_for_exit(pid, 1.0)
                     logger.warning(f"Force killed process {pid} for session {session_id}")
 
                 # Reap the process to prevent zombie
-                try:
-                    os.waitpid(pid, os.WNOHANG)
-                except (OSError, ChildProcessError):
-                    pass
+                self._reap(pid)
 
             except OSError:
                 pass  # Process already dead
@@ -342,8 +771,8 @@ class GenerationManager:
         # Update state
         state["status"] = "cancelled"
         state["error"] = "Cancelled by user"
-        state["updated_at"] = datetime.utcnow().isoformat() + "Z"
-        self._write_state(session_id, state)
+        state["updated_at"] = _utc_timestamp()
+        self._write_final_state(session_id, state)
 
         return {
             "session_id": session_id,
@@ -351,13 +780,14 @@ class GenerationManager:
             "message": "Generation cancelled successfully",
         }
 
-    def _update_session_state(self, session_id: str, updates: Dict[str, Any]):
-        """Update specific fields in session state"""
+    def record_download(self, session_id: str, download: Dict[str, Any]):
+        """Append a downloaded video record to the session's download journal
+
+        Appending keeps each download a single small write instead of a full
+        rewrite of the session state file.
+        """
         try:
-            state = self._read_state(session_id)
-            if state:
-                state.update(updates)
-                state["updated_at"] = datetime.utcnow().isoformat() + "Z"
-                self._write_state(session_id, state)
+            with open(self._get_downloads_file(session_id), "ab") as f:
+                f.write(orjson.dumps(download) + b"\n")
         except Exception as e:
-            logger.error(f"Failed to update session state: {e}")
+            logger.error(f"Failed to record download: {e}")
@@ -3,25 +3,37 @@
 
 import argparse
 import asyncio
-import json
 import logging
+import os
 import signal
+import socket
 import sys
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+import orjson
 
 from src.config import Config
-from src.utils.veo_client import VeoClient
-
-# Configure logging for the worker
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stderr)],
-)
+from src.utils.json_io import load_json, write_json_atomic
+from src.utils.logging import setup_logging
+from src.utils.veo_client import VeoClient, extract_file_id
+
+# Configure logging for the worker; its stderr goes to a log file, so output is buffered
+setup_logging(level="INFO", buffered=True)
 logger = logging.getLogger(__name__)
 
+# Final statuses of a generation; these state writes are fsynced
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+# Minimum interval between progress-only state writes, in seconds
+FLUSH_INTERVAL = 0.5
+
+# State fields the manager writes after the worker has started
+MANAGER_FIELDS = ("pid", "pid_starttime")
+
 
 class GenerationWorker:
     """Handles Veo video generation with progress tracking"""
@@ -30,48 +42,139 @@ class GenerationWorker:
         self.session_id = session_id
         self.state_dir = Path(state_dir)
         self.state_file = self.state_dir / f"{session_id}.json"
+        self.events_file = self.state_dir / f"{session_id}.events.jsonl"
+        self._journal = None
         self.interrupted = False
-
-        # Set up signal handlers
+        self._pending: Dict[str, Any] = {}
+        self._last_flush = 0.0
+        self._flushed_status = None
+        # Event loop of generate(), which writes out updates held back by the rate limit
+        self._loop = None
+        self._flush_scheduled = False
+        # State is updated from the event loop and from SDK calls running in threads
+        self._state_lock = threading.RLock()
+
+        # The worker is the sole writer of its session state, so it is loaded once
+        # and kept in memory; the pid is set here in case the manager's write of it
+        # lands after this load.
+        self._state = self._read_state()
+        self._state["pid"] = os.getpid()
+
+        # Set up signal handlers; generate() moves them onto its event loop
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
 
     def _signal_handler(self, signum, frame):
-        """Handle termination signals"""
+        """Handle termination signals received before the event loop runs"""
+        self._on_signal()
+
+    def _install_signal_handlers(self):
+        """Handle termination signals on the event loop
+
+        The loop's handlers only write to a wakeup pipe in signal context; the
+        state update runs in _on_signal as a regular loop callback.
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._on_signal)
+
+    def _on_signal(self):
+        """Record the cancellation and exit"""
         self.interrupted = True
-        self._update_state({"status": "cancelled", "error": "Generation interrupted"})
-        sys.exit(0)
+        self._update_state({"status": "cancelled", "error": "Generation interrupted"}, force=True)
+        logging.shutdown()
+        # SDK calls running in threads cannot be interrupted, so exit without joining them
+        os._exit(0)
 
     def _read_state(self) -> Dict[str, Any]:
         """Read current state from file"""
         try:
-            with open(self.state_file, "r") as f:
-                return json.load(f)
+            return load_json(self.state_file)
         except Exception as e:
             logger.error(f"Error reading state: {e}")
             return {}
 
-    def _update_state(self, updates: Dict[str, Any]):
-        """Update state file with new values atomically"""
-        state = self._read_state()
-        state.update(updates)
+    def _update_state(self, updates: Dict[str, Any], force: bool = False):
+        """Queue state updates and flush them when due
+
+        Status changes, terminal statuses and forced updates rewrite the state
+        snapshot; progress-only updates are appended to the event journal at most
+        once per FLUSH_INTERVAL.
+        """
+        with self._state_lock:
+            self._pending.update(updates)
+            self._maybe_flush(force or updates.get("status") in TERMINAL_STATUSES)
+
+    def _maybe_flush(self, force: bool = False, due: bool = False):
+        """Write pending updates if forced, due or the status changed
+
+        Updates held back by the rate limit are written by a trailing flush once
+        FLUSH_INTERVAL has passed, so they show up even if no later update comes.
+        """
+        if not self._pending:
+            return
+        status_changed = self._pending.get("status", self._flushed_status) != self._flushed_status
+        since_flush = time.monotonic() - self._last_flush
+        if not (force or status_changed or due or since_flush > FLUSH_INTERVAL):
+            self._schedule_flush(FLUSH_INTERVAL - since_flush)
+            return
+
+        state = self._state
+        state.update(self._pending)
         state["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-        temp_file = self.state_file.with_suffix(".tmp")
         try:
-            # Write to temporary file first
-            with open(temp_file, "w") as f:
-                json.dump(state, f, indent=2)
-
-            # Atomically replace the original file
-            temp_file.replace(self.state_file)
+            if force or status_changed:
+                self._write_snapshot(state)
+            else:
+                self._append_event(state["updated_at"])
         except Exception as e:
             logger.error(f"Error updating state: {e}")
-            # Clean up temp file on error
-            temp_file.unlink(missing_ok=True)
+            return
+
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._flushed_status = state.get("status")
+
+    def _schedule_flush(self, delay: float):
+        """Schedule a trailing flush on the event loop; may be called from any thread"""
+        if self._loop is None or self._loop.is_closed() or self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._flush_pending)
+
+    def _flush_pending(self):
+        """Write updates held back by the rate limit"""
+        with self._state_lock:
+            self._flush_scheduled = False
+            self._maybe_flush(due=True)
+
+    def _append_event(self, updated_at: str):
+        """Append pending progress updates to the session's event journal"""
+        if self._journal is None:
+            self._journal = open(self.events_file, "ab", buffering=0)
+        # The status is unchanged since the last snapshot, so it is not journaled
+        event = {key: value for key, value in self._pending.items() if key != "status"}
+        event["updated_at"] = updated_at
+        self._journal.write(orjson.dumps(event) + b"\n")
+
+    def _write_snapshot(self, state: Dict[str, Any]):
+        """Rewrite the state snapshot, which supersedes all journaled events
+
+        The journal is truncated first, so a reader never folds stale events over
+        a newer snapshot. Terminal statuses are written durably (fsynced). Fields
+        the manager may have written after the state was loaded are kept.
+        """
+        on_disk = self._read_state()
+        state.update({key: on_disk[key] for key in MANAGER_FIELDS if on_disk.get(key) is not None})
+        if self._journal is not None:
+            self._journal.truncate(0)
+        write_json_atomic(self.state_file, state, durable=state.get("status") in TERMINAL_STATUSES)
 
     async def generate(self, args):
         """Main generation process"""
+        self._loop = asyncio.get_running_loop()
+        self._install_signal_handlers()
         try:
             # Update status
             self._update_state(
@@ -150,7 +253,9 @@ class GenerationWorker:
             # Step 1: Start video generation using native SDK
             self._update_state({"progress": "starting video generation"})
 
-            generation_result = veo_client.start_video_generation(
+            # The blocking SDK call runs in a thread so the loop can handle signals meanwhile
+            generation_result = await asyncio.to_thread(
+                veo_client.start_video_generation,
                 prompt=args.prompt,
                 model=args.model,
                 image_bytes=image_bytes,
@@ -208,7 +313,7 @@ class GenerationWorker:
                 if updates:
                     self._update_state(updates)
 
-            result = veo_client.poll_until_complete(operation, progress_callback)
+            result = await veo_client.poll_until_complete(operation, progress_callback, args.duration_seconds)
 
             # Check result
             if result.get("error"):
@@ -224,6 +329,28 @@ class GenerationWorker:
                 # Video generation completed successfully
                 videos = result.get("videos", [])
 
+                # Download all videos concurrently if a download directory was given
+                downloaded_videos = []
+                if args.download_path:
+                    self._update_state({"progress": "downloading videos"})
+                    to_download = [(video, extract_file_id(video.get("uri") or "")) for video in videos]
+                    to_download = [(video, file_id) for video, file_id in to_download if file_id]
+                    download_results = await veo_client.download_videos(
+                        [file_id for _, file_id in to_download], args.download_path
+                    )
+                    for (video, _), download_result in zip(to_download, download_results):
+                        if download_result.get("success"):
+                            video["downloaded"] = True
+                            downloaded_videos.append(
+                                {
+                                    "index": video["index"],
+                                    "file_path": download_result["file_path"],
+                                    "file_size": download_result["file_size"],
+                                }
+                            )
+                        else:
+                            logger.error(f"Failed to download video {video['index']}: {download_result.get('error')}")
+
                 # Update state with video information
                 state_update = {
                     "status": "completed",
@@ -232,6 +359,8 @@ class GenerationWorker:
                     "video_count": result.get("video_count", len(videos)),
                     "completed_at": datetime.now(timezone.utc).isoformat(),
                 }
+                if downloaded_videos:
+                    state_update["downloaded_videos"] = downloaded_videos
 
                 self._update_state(state_update)
 
@@ -253,7 +382,35 @@ class GenerationWorker:
             sys.exit(1)
 
 
+def _receive_job(fd: int) -> List[str]:
+    """Wait for a job from the worker pool and redirect output to its log files
+
+    Returns:
+        Command-line arguments of the job
+    """
+    chunks = []
+    with socket.socket(fileno=fd) as sock:
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    if not chunks:
+        sys.exit(0)  # The pool was closed without handing out a job
+
+    job = orjson.loads(b"".join(chunks))
+    for path, target_fd in ((job["stdout_log"], 1), (job["stderr_log"], 2)):
+        log_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.dup2(log_fd, target_fd)
+        os.close(log_fd)
+    return job["argv"]
+
+
 def main():
+    # Pooled workers are started with only --pool-fd and receive their arguments later
+    pool_parser = argparse.ArgumentParser(add_help=False)
+    pool_parser.add_argument("--pool-fd", type=int, default=None)
+    pool_args, argv = pool_parser.parse_known_args()
+    if pool_args.pool_fd is not None:
+        argv = _receive_job(pool_args.pool_fd)
+
     parser = argparse.ArgumentParser(description="Veo Video Generation Worker")
     parser.add_argument("--session-id", required=True, help="Generation session ID")
     parser.add_argument("--state-dir", required=True, help="State directory path")
@@ -283,7 +440,7 @@ def main():
     parser.add_argument("--download-path", default=None, help="Directory to download videos to")
 
     try:
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
 
         # Create worker and start generation
         worker = GenerationWorker(args.session_id, args.state_dir)
@@ -0,0 +1,67 @@
+"""Fast JSON file helpers backed by orjson"""
+
+import os
+import secrets
+from pathlib import Path
+from typing import Any, Tuple, Union
+
+import orjson
+
+
+def load_json(path: Path) -> Any:
+    """Read and parse a JSON file in a single read"""
+    return orjson.loads(path.read_bytes())
+
+
+def load_json_with_stat(path: Union[str, Path]) -> Tuple[Any, os.stat_result]:
+    """Read and parse a JSON file with a single read sized by fstat
+
+    Returns the parsed data together with the stat of the file that was read.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        stat = os.fstat(fd)
+        data = os.read(fd, stat.st_size)
+    finally:
+        os.close(fd)
+    return orjson.loads(data), stat
+
+
+def write_json_atomic(path: Path, data: Any, durable: bool = False, indent: bool = True) -> None:
+    """Write JSON data to a file atomically via a temporary file and rename
+
+    With durable=True the file contents and the rename are fsynced, so the new
+    data survives a crash or power loss. Without it the replacement is still
+    atomic, but may be lost if the system goes down shortly after. Pass
+    indent=False for files not meant to be read by people.
+    """
+    # The manager and a worker may write the same file concurrently, so each
+    # write gets its own exclusively created temporary file
+    temp_file = path.with_name(f"{path.name}.{os.getpid()}-{secrets.token_hex(4)}.tmp")
+    payload = memoryview(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None))
+
+    try:
+        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            # A single write for state-sized payloads; loop only on a short write
+            while payload:
+                payload = payload[os.write(fd, payload) :]
+            if durable:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        # Atomically replace the original file
+        os.replace(temp_file, path)
+    except Exception:
+        # Clean up temp file on error
+        temp_file.unlink(missing_ok=True)
+        raise
+
+    if durable:
+        # Persist the directory entry created by the rename
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
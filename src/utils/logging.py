@@ -1,23 +1,50 @@
 """Shared logging configuration for Veo MCP server"""
 
+import io
 import logging
 import sys
 from typing import Optional
 
 
-def setup_logging(level: str = "INFO", format: Optional[str] = None) -> None:
+class BufferedStderrHandler(logging.StreamHandler):
+    """Stream handler writing to stderr through a large buffer
+
+    Records are written out when the buffer fills, immediately for records at or
+    above flush_level, and on logging.shutdown(), which flushes all handlers.
+    """
+
+    def __init__(self, buffer_size: int = 65536, flush_level: int = logging.ERROR):
+        raw = io.FileIO(sys.stderr.fileno(), "w", closefd=False)
+        super().__init__(io.TextIOWrapper(io.BufferedWriter(raw, buffer_size=buffer_size), write_through=False))
+        self.flush_level = flush_level
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= self.flush_level:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+def setup_logging(level: str = "INFO", format: Optional[str] = None, buffered: bool = False) -> None:
     """
     Configure logging for the application.
 
     Args:
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         format: Custom log format string
+        buffered: Buffer stderr output, flushing on errors, for processes whose
+            stderr goes to a log file rather than an interactive client
     """
     if format is None:
         format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
+    handler = BufferedStderrHandler() if buffered else logging.StreamHandler(sys.stderr)
     logging.basicConfig(
         level=getattr(logging, level.upper()),
         format=format,
-        handlers=[logging.StreamHandler(sys.stderr)],
+        handlers=[handler],
     )
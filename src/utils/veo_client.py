@@ -1,25 +1,105 @@
 """Veo API client for video generation using Gemini API"""
 
+import asyncio
 import logging
+import os
+import random
+import re
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 
+import requests
 from google import genai
 from google.genai import types
 
 logger = logging.getLogger(__name__)
 
+# Gemini API file download endpoint relative to the SDK's base URL, used when a
+# file has no download URI
+FILE_DOWNLOAD_PATH = "{api_version}/files/{file_id}:download?alt=media"
+
+# Maximum number of redirects followed by a video download
+MAX_DOWNLOAD_REDIRECTS = 5
+
+# Size of the chunks a video download is streamed to disk in
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Seconds file metadata from files.get is reused for
+FILE_CACHE_TTL = 300
+
+# Maximum number of files whose metadata is kept by _get_file
+FILE_CACHE_SIZE = 256
+
+# Maximum number of concurrent downloads in download_videos
+MAX_CONCURRENT_DOWNLOADS = 8
+
+# Matches the file ID in download URIs of the form
+# https://generativelanguage.googleapis.com/v1beta/files/FILE_ID:download?alt=media
+_FILE_ID_RE = re.compile(r"files/([^:/]+):download")
+
+
+# genai clients shared by all VeoClient instances, keyed by API key
+_clients: Dict[str, genai.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_genai_client(api_key: str) -> genai.Client:
+    """Return the process-wide genai client for an API key, creating it on first use"""
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                client = _clients[api_key] = genai.Client(api_key=api_key)
+    return client
+
+
+# Numeric SDK parameters, passed whenever set (including 0); other optional
+# parameters are passed only when truthy
+_NUMERIC_PARAMS = frozenset({"duration_seconds", "seed", "fps"})
+
+
+def extract_file_id(video_uri: str) -> Optional[str]:
+    """Extract the file ID from a video download URI, or None if it has none"""
+    match = _FILE_ID_RE.search(video_uri)
+    return match.group(1) if match else None
+
 
 class VeoClient:
     """Client for Google Veo video generation using Gemini API"""
 
-    def __init__(self, api_key: str, default_model: Optional[str] = None):
-        """Initialize client with API key"""
+    def __init__(
+        self,
+        api_key: str,
+        default_model: Optional[str] = None,
+        base_delay: float = 2.0,
+        max_delay: float = 20.0,
+        jitter: float = 1.0,
+    ):
+        """Initialize client with API key
+
+        Args:
+            api_key: Gemini API key
+            default_model: Model used when a call does not specify one
+            base_delay: First delay between operation polls, in seconds
+            max_delay: Cap on the exponentially growing poll delay, in seconds
+            jitter: Maximum random delay added to each poll delay, in seconds
+        """
         self.api_key = api_key
         self.default_model = default_model
-        self.client = genai.Client(api_key=api_key)
-        logger.debug(f"Initialized Veo client with model: {default_model}")
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        # file_id -> (monotonic fetch time, file object from files.get), least recently used first
+        self._file_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Downloads look up files from worker threads
+        self._file_cache_lock = threading.Lock()
+        self.client = _get_genai_client(api_key)
+        logger.debug("Initialized Veo client with model: %s", default_model)
 
     def start_video_generation(
         self,
@@ -56,39 +136,34 @@ class VeoClient:
                 return {"error": "Either prompt or image must be provided", "done": True}
 
             # Log the attempt
-            logger.info(f"Starting video generation with model: {model_to_use}")
+            logger.info("Starting video generation with model: %s", model_to_use)
             if prompt:
-                logger.info(f"Prompt: {prompt}")
+                logger.info("Prompt: %s", prompt)
             if image_bytes:
-                logger.info(f"Image provided: {len(image_bytes)} bytes, mime_type: {image_mime_type}")
+                logger.info("Image provided: %d bytes, mime_type: %s", len(image_bytes), image_mime_type)
 
             # Build config for video generation using all supported SDK parameters
+            optional_params = {
+                "enhance_prompt": enhance_prompt,
+                "generate_audio": generate_audio,
+                "negative_prompt": negative_prompt,
+                "aspect_ratio": aspect_ratio,
+                "resolution": resolution,
+                "person_generation": person_generation,
+                "duration_seconds": duration_seconds,
+                "seed": seed,
+                "output_gcs_uri": output_gcs_uri,
+                "fps": fps,
+            }
             config_params = {
                 "number_of_videos": number_of_videos,
+                **{
+                    name: value
+                    for name, value in optional_params.items()
+                    if (value is not None if name in _NUMERIC_PARAMS else value)
+                },
             }
 
-            # Add optional parameters that are supported by the SDK
-            if enhance_prompt:
-                config_params["enhance_prompt"] = enhance_prompt
-            if generate_audio:
-                config_params["generate_audio"] = generate_audio
-            if negative_prompt:
-                config_params["negative_prompt"] = negative_prompt
-            if aspect_ratio:
-                config_params["aspect_ratio"] = aspect_ratio
-            if resolution:
-                config_params["resolution"] = resolution
-            if person_generation:
-                config_params["person_generation"] = person_generation
-            if duration_seconds is not None:
-                config_params["duration_seconds"] = duration_seconds
-            if seed is not None:
-                config_params["seed"] = seed
-            if output_gcs_uri:
-                config_params["output_gcs_uri"] = output_gcs_uri
-            if fps is not None:
-                config_params["fps"] = fps
-
             # Create config object
             video_config = types.GenerateVideosConfig(**config_params)
 
@@ -110,103 +185,127 @@ class VeoClient:
             }
 
         except Exception as e:
-            logger.error(f"Video generation error: {type(e).__name__}: {str(e)}")
+            logger.error("Video generation error: %s: %s", type(e).__name__, e)
             return {
                 "error": f"Failed to start video generation: {str(e)}",
                 "done": True,
             }
 
-    def get_operation_status(self, operation_name: str) -> Dict[str, Any]:
+    @staticmethod
+    def _read_outcome(operation) -> Tuple[Any, Any]:
+        """Get the error and generated videos of a completed operation
+
+        Each is read once with a getattr default, so a missing error or result
+        needs neither a hasattr probe nor exception handling.
+        """
+        error = getattr(operation, "error", None)
+        generated_videos = getattr(getattr(operation, "result", None), "generated_videos", None)
+        return error, generated_videos
+
+    @staticmethod
+    def _extract_videos(generated_videos, **extra_fields) -> List[Dict[str, Any]]:
+        """Build video info dicts from the generated videos of a completed operation
+
+        Args:
+            generated_videos: Generated videos from the operation result
+            **extra_fields: Additional fields set on every video info dict
+        """
+        return [
+            {
+                "index": i,
+                "uri": getattr(generated_video.video, "uri", None) or getattr(generated_video.video, "name", None),
+                "mime_type": "video/mp4",
+                **extra_fields,
+            }
+            for i, generated_video in enumerate(generated_videos)
+        ]
+
+    async def get_operation_status(self, operation_name: str) -> Dict[str, Any]:
         """
         Check the status of a video generation operation.
 
-        Uses the SDK's operations.get method.
+        Uses the SDK's async operations.get method.
         """
         try:
-            # Get operation using the operations API
-            operation = self.client.operations.get(operation=operation_name)
+            # Get operation using the async operations API
+            operation = await self.client.aio.operations.get(operation=operation_name)
 
             result = {
-                "operation_name": (operation.name if hasattr(operation, "name") else operation_name),
+                "operation_name": getattr(operation, "name", None) or operation_name,
                 "done": operation.done,
                 "operation": operation,  # Store the operation object for later use
             }
 
             if operation.done:
+                error, generated_videos = self._read_outcome(operation)
                 # Check for error
-                if hasattr(operation, "error") and operation.error:
-                    result["error"] = str(operation.error)
+                if error:
+                    result["error"] = str(error)
                 # Extract videos from result
-                elif hasattr(operation, "result") and hasattr(operation.result, "generated_videos"):
-                    videos = []
-                    for i, generated_video in enumerate(operation.result.generated_videos):
-                        video_uri = None
-                        if hasattr(generated_video.video, "uri"):
-                            video_uri = generated_video.video.uri
-                        elif hasattr(generated_video.video, "name"):
-                            video_uri = generated_video.video.name
-
-                        videos.append(
-                            {
-                                "index": i,
-                                "uri": video_uri,
-                                "mime_type": "video/mp4",
-                            }
-                        )
-
+                elif generated_videos is not None:
+                    videos = self._extract_videos(generated_videos)
                     result["videos"] = videos
                     result["video_count"] = len(videos)
 
             return result
 
         except Exception as e:
-            logger.error(f"Operation status error: {type(e).__name__}: {str(e)}")
+            logger.error("Operation status error: %s: %s", type(e).__name__, e)
             return {"error": f"Failed to get operation status: {str(e)}", "done": True}
 
-    def poll_until_complete(self, operation, progress_callback: Optional[callable] = None) -> Dict[str, Any]:
+    async def poll_until_complete(
+        self,
+        operation,
+        progress_callback: Optional[callable] = None,
+        duration_seconds: Optional[int] = None,
+        *,
+        deadline: Optional[float] = None,
+        max_wait_time: float = 600,
+    ) -> Dict[str, Any]:
         """
         Poll an operation until completion using native SDK components.
+
+        Uses the SDK's async client, so no thread is held while waiting between polls.
+        When the requested video duration is known, the first poll is delayed by
+        an estimate of the render time, as longer videos take longer to generate.
+
+        Args:
+            deadline: Caller's deadline as a time.monotonic() value; polling stops
+                once it or max_wait_time is reached. Cancelling the calling task
+                stops polling at the next await.
+            max_wait_time: Longest time to poll for, in seconds
         """
         try:
             logger.info("Polling operation for completion...")
-            start_time = time.time()
-            max_wait_time = 600  # 10 minutes
+            start_time = time.monotonic()
+            effective_deadline = min(deadline or float("inf"), start_time + max_wait_time)
+            attempt = 0
+
+            if duration_seconds:
+                first_delay = max(20, 6 * duration_seconds)
+                logger.debug("Waiting %ds before the first poll", first_delay)
+                first_delay = min(first_delay, effective_deadline - start_time)
+                await asyncio.sleep(max(0.0, first_delay))
 
             while True:
                 # Get operation status using native SDK
-                operation = self.client.operations.get(operation=operation)
+                operation = await self.client.aio.operations.get(operation=operation)
 
                 if operation.done:
                     # Check for errors
-                    if hasattr(operation, "error") and operation.error:
-                        error_msg = f"Generation failed: {operation.error}"
+                    error, generated_videos = self._read_outcome(operation)
+                    if error:
+                        error_msg = f"Generation failed: {error}"
                         if progress_callback:
                             progress_callback({"status": "failed", "error": error_msg})
                         return {"error": error_msg, "success": False}
 
                     # Success - extract videos
                     try:
-                        generated_videos = operation.result.generated_videos
                         if not generated_videos:
                             return {"error": "No videos generated", "success": False}
 
-                        videos = []
-                        for i, generated_video in enumerate(generated_videos):
-                            video = generated_video.video
-                            video_uri = None
-                            if hasattr(video, "uri"):
-                                video_uri = video.uri
-                            elif hasattr(video, "name"):
-                                video_uri = video.name
-
-                            videos.append(
-                                {
-                                    "index": i,
-                                    "uri": video_uri,
-                                    "mime_type": "video/mp4",
-                                    "downloaded": False,
-                                }
-                            )
+                        videos = self._extract_videos(generated_videos, downloaded=False)
 
                         return {
                             "success": True,
@@ -215,26 +314,20 @@ class VeoClient:
                         }
 
                     except Exception as e:
-                        logger.error(f"Error accessing video results: {e}")
+                        logger.error("Error accessing video results: %s", e)
                         return {
                             "error": f"Failed to access video results: {str(e)}",
                             "success": False,
                         }
 
                 # Check timeout
-                elapsed = time.time() - start_time
-                if elapsed > max_wait_time:
+                now = time.monotonic()
+                elapsed = now - start_time
+                if now >= effective_deadline:
+                    timeout_msg = f"Timeout after {int(elapsed)} seconds"
                     if progress_callback:
-                        progress_callback(
-                            {
-                                "status": "failed",
-                                "error": f"Timeout after {max_wait_time} seconds",
-                            }
-                        )
-                    return {
-                        "error": f"Timeout after {max_wait_time} seconds",
-                        "success": False,
-                    }
+                        progress_callback({"status": "failed", "error": timeout_msg})
+                    return {"error": timeout_msg, "success": False}
 
                 # Update progress
                 if progress_callback:
@@ -245,35 +338,111 @@ class VeoClient:
                         }
                     )
 
-                logger.debug(f"Waiting... ({int(elapsed)}s elapsed)")
-                time.sleep(20)  # Poll every 20 seconds as per SDK examples
+                # Exponential backoff with jitter: short jobs are noticed early,
+                # long ones are polled at most every max_delay seconds
+                delay = min(self.max_delay, self.base_delay * 2**attempt) + random.uniform(0, self.jitter)
+                # Never sleep past the deadline; the last poll happens right at it
+                delay = min(delay, effective_deadline - now)
+                attempt += 1
+                logger.debug("Waiting %.1fs... (%ds elapsed)", delay, elapsed)
+                await asyncio.sleep(delay)
 
         except Exception as e:
-            logger.error(f"Polling failed: {e}")
+            logger.error("Polling failed: %s", e)
             return {"error": f"Polling failed: {str(e)}", "success": False}
 
+    def _get_file(self, file_id: str) -> Any:
+        """Get a file object using native SDK, reusing it for FILE_CACHE_TTL seconds
+
+        At most FILE_CACHE_SIZE files are kept; expired entries are dropped when looked up.
+        """
+        now = time.monotonic()
+        with self._file_cache_lock:
+            cached = self._file_cache.get(file_id)
+            if cached is not None:
+                if now - cached[0] < FILE_CACHE_TTL:
+                    self._file_cache.move_to_end(file_id)
+                    return cached[1]
+                del self._file_cache[file_id]  # Expired
+
+        file_obj = self.client.files.get(name=f"files/{file_id}")
+        with self._file_cache_lock:
+            self._file_cache[file_id] = (now, file_obj)
+            self._file_cache.move_to_end(file_id)
+            if len(self._file_cache) > FILE_CACHE_SIZE:
+                self._file_cache.popitem(last=False)
+        return file_obj
+
+    def _get_http_options(self) -> Dict[str, Any]:
+        """Get the base URL, API version and headers the SDK client sends requests with"""
+        http_options = {
+            "base_url": "https://generativelanguage.googleapis.com/",
+            "api_version": "v1beta",
+            "headers": {"x-goog-api-key": self.api_key},
+        }
+        try:
+            sdk_options = self.client._api_client.get_read_only_http_options()
+        except AttributeError:
+            return http_options  # SDK without the accessor; use the Gemini API defaults
+        http_options.update({key: sdk_options[key] for key in http_options if sdk_options.get(key)})
+        return http_options
+
+    def _open_download(self, url: str) -> requests.Response:
+        """Start a streamed download, following redirects
+
+        Redirects are followed here rather than by requests, which would keep the
+        API key header on a redirect to another host. The key is dropped as soon
+        as the host changes.
+        """
+        headers = {
+            key: value for key, value in self._get_http_options()["headers"].items() if key.lower() != "content-type"
+        }
+        for _ in range(MAX_DOWNLOAD_REDIRECTS + 1):
+            response = requests.get(url, headers=headers, stream=True, timeout=60, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            response.close()
+            next_url = urljoin(url, response.headers["location"])
+            if urlsplit(next_url).hostname != urlsplit(url).hostname:
+                headers = {key: value for key, value in headers.items() if key.lower() != "x-goog-api-key"}
+            url = next_url
+        raise requests.TooManyRedirects(f"Exceeded {MAX_DOWNLOAD_REDIRECTS} redirects")
+
     def download_video_by_file_id(self, file_id: str, output_path: str) -> Dict[str, Any]:
         """
-        Download a video using native SDK components by file ID.
+        Download a video by file ID, streaming it to disk in chunks.
+
+        The file is fetched over HTTP rather than with files.download(), which
+        returns the whole video as bytes in memory.
         """
         try:
             # Ensure output directory exists
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-            # Get the file object using native SDK
-            file_obj = self.client.files.get(name=f"files/{file_id}")
-
-            # Download using native SDK - this returns bytes
-            video_bytes = self.client.files.download(file=file_obj)
-
-            # Write bytes to disk
-            with open(output_path, "wb") as f:
-                f.write(video_bytes)
-
-            # Get file size
-            file_size = Path(output_path).stat().st_size
-
-            logger.info(f"Downloaded video to {output_path} ({file_size} bytes)")
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+            file_obj = self._get_file(file_id)
+            download_uri = getattr(file_obj, "download_uri", None)
+            if not download_uri:
+                http_options = self._get_http_options()
+                download_uri = urljoin(
+                    http_options["base_url"],
+                    FILE_DOWNLOAD_PATH.format(api_version=http_options["api_version"], file_id=file_id),
+                )
+
+            file_size = 0
+            try:
+                with self._open_download(download_uri) as response:
+                    response.raise_for_status()
+                    with open(output_path, "wb", buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            file_size += f.write(chunk)
+            except Exception:
+                # Don't leave a partial video behind
+                Path(output_path).unlink(missing_ok=True)
+                raise
+
+            logger.info("Downloaded video to %s (%d bytes)", output_path, file_size)
 
             return {
                 "file_path": output_path,
@@ -282,5 +451,26 @@ class VeoClient:
             }
 
         except Exception as e:
-            logger.error(f"Download error: {type(e).__name__}: {str(e)}")
+            logger.error("Download error: %s: %s", type(e).__name__, e)
             return {"error": f"Failed to download video: {str(e)}", "success": False}
+
+    async def download_videos(self, file_ids: List[str], output_dir: str) -> List[Dict[str, Any]]:
+        """
+        Download several videos concurrently, each to <output_dir>/<file_id>.mp4.
+
+        At most MAX_CONCURRENT_DOWNLOADS run at once. Results are in the order of file_ids.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+        async def download(file_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                output_path = str(Path(output_dir) / f"{file_id}.mp4")
+                return await asyncio.to_thread(self.download_video_by_file_id, file_id, output_path)
+
+        results = await asyncio.gather(*(download(file_id) for file_id in file_ids), return_exceptions=True)
+        return [
+            {"error": f"Failed to download video: {result}", "success": False}
+            if isinstance(result, BaseException)
+            else result
+            for result in results
+        ]
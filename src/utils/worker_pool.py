@@ -0,0 +1,76 @@
+"""Pool of pre-started generation worker processes"""
+
+import logging
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """Keeps generation workers started ahead of time, with their imports done
+
+    Each idle worker blocks reading a job from its end of a socket pair. A job is
+    the worker's command-line arguments plus the paths of its log files; the
+    worker redirects its output to those files and runs the generation.
+    """
+
+    def __init__(self, size: int = 2):
+        self.size = size
+        self._idle: List[Tuple[subprocess.Popen, socket.socket]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[Tuple[int, socket.socket]]:
+        """Take a live idle worker out of the pool
+
+        Returns:
+            PID and job socket of the worker, or None if no idle worker is available
+        """
+        with self._lock:
+            while self._idle:
+                proc, sock = self._idle.pop()
+                if proc.poll() is None:
+                    return proc.pid, sock
+                sock.close()
+        return None
+
+    @staticmethod
+    def send_job(sock: socket.socket, argv: List[str], stdout_log: Path, stderr_log: Path):
+        """Send a job to an acquired worker, which starts running it"""
+        job = orjson.dumps({"argv": argv, "stdout_log": str(stdout_log), "stderr_log": str(stderr_log)})
+        with sock:
+            sock.sendall(job)  # Closing the socket marks the end of the job
+
+    def fill(self, cwd: str, env: Dict[str, str]):
+        """Start workers until the pool is full; failures are logged, leaving the pool short"""
+        with self._lock:
+            while len(self._idle) < self.size:
+                try:
+                    parent_sock, child_sock = socket.socketpair()
+                except OSError as e:
+                    logger.warning(f"Failed to start pooled worker: {e}")
+                    return
+                try:
+                    proc = subprocess.Popen(
+                        [sys.executable, "-m", "src.utils.generation_worker", "--pool-fd", str(child_sock.fileno())],
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        pass_fds=(child_sock.fileno(),),
+                        start_new_session=True,
+                        cwd=cwd,
+                        env=env,
+                    )
+                except OSError as e:
+                    parent_sock.close()
+                    logger.warning(f"Failed to start pooled worker: {e}")
+                    return
+                finally:
+                    child_sock.close()
+                self._idle.append((proc, parent_sock))